@@ -1,9 +1,21 @@
 import sys
 import random
-from typing import List, Optional, Tuple
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
 
 import pygame
 
+try:
+    import numpy as np
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # без numba поиск выполняется на чистом Python (GameState.negamax)
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
 
 # ------------------------------------------------------------
 # Настройки отрисовки
@@ -15,6 +27,200 @@ BG_COLOR = (240, 240, 240)
 X_COLOR = (200, 0, 0)
 O_COLOR = (0, 0, 200)
 WIN_LINE_COLOR = (0, 180, 0)
+TEXT_COLOR = (0, 0, 0)
+CELL_SYMBOLS = ".XO"  # символ клетки по её значению в GameState.cells
+TEXT_CACHE_LIMIT = 32  # сколько отрисованных строк статуса хранить
+EVENT_WAIT_MS = 200  # сколько ждать событий в ход человека, прежде чем проверить состояние
+
+
+# ------------------------------------------------------------
+# Настройки ИИ
+# ------------------------------------------------------------
+
+AI_TIME_LIMIT = 1.0  # сколько секунд ИИ может думать над одним ходом
+TT_MAX_ENTRIES = 500_000  # предельный размер таблицы транспозиций
+KERNEL_TT_BITS = 18  # таблица транспозиций numba-ядра — 2^18 слотов
+AI_CACHE_MAX_ENTRIES = 100_000  # сколько выбранных ходов помнить для каждого (n, k)
+SPECIALIZE_MAX_SIZE = 8  # до какого размера поля генерировать развёрнутую проверку победы
+
+# оценки позиций: победа всегда дороже любой эвристической оценки
+WIN_SCORE = 1 << 62
+WIN_THRESHOLD = WIN_SCORE - 10_000  # |оценка| выше порога — форсированный результат
+INF = WIN_SCORE + 1
+# вес линии 4^(число фигур) ограничен 2^EVAL_MAX_SHIFT, а вся оценка — EVAL_LIMIT,
+# чтобы эвристика при любых n и k оставалась ниже WIN_THRESHOLD
+EVAL_MAX_SHIFT = 40
+EVAL_LIMIT = 1 << 60
+# доля оставшегося времени, на которую рассчитан node_limit numba-ядра
+KERNEL_TIME_MARGIN = 0.8
+
+# тип значения в таблице транспозиций
+TT_EXACT = 0
+TT_LOWER = 1  # оценка — нижняя граница (было отсечение по beta)
+TT_UPPER = 2  # оценка — верхняя граница (ни один ход не улучшил alpha)
+
+
+class SearchTimeout(Exception):
+    """Исчерпано время, отведённое на поиск хода."""
+
+
+# ------------------------------------------------------------
+# Ядро поиска для numba
+# ------------------------------------------------------------
+#
+# Функции ниже получают только числа и массивы NumPy (атрибуты GameState
+# numba не видит). Поле — плоский массив uint8 длины n*n:
+# 0 — пусто, 1 — X, 2 — O. Линии — массив lines[L, k] номеров клеток,
+# линии через клетку idx — through[through_start[idx]:through_start[idx + 1]].
+# Таблица транспозиций — tt_key[S] (полный хэш) и tt_data[S] =
+# (depth, value, flag, best_move), слот выбирается как hash & tt_mask.
+# killers[depth] — два последних хода, давших отсечение на этой глубине.
+# stats[0] — счётчик узлов, stats[1] — флаг прерывания по node_limit.
+
+
+@njit(cache=True, nogil=True)
+def _wins_at_kernel(board, idx, player, lines, through_start, through):
+    k = lines.shape[1]
+    for p in range(through_start[idx], through_start[idx + 1]):
+        line = through[p]
+        complete = True
+        for j in range(k):
+            if board[lines[line, j]] != player:
+                complete = False
+                break
+        if complete:
+            return True
+    return False
+
+
+@njit(cache=True, nogil=True)
+def _evaluate_kernel(board, player, lines):
+    score = 0
+    k = lines.shape[1]
+    for line in range(lines.shape[0]):
+        mine = 0
+        theirs = 0
+        for j in range(k):
+            v = board[lines[line, j]]
+            if v == player:
+                mine += 1
+            elif v != 0:
+                theirs += 1
+        if mine > 0 and theirs == 0:
+            score += 1 << min(2 * mine, EVAL_MAX_SHIFT)
+        elif theirs > 0 and mine == 0:
+            score -= 1 << min(2 * theirs, EVAL_MAX_SHIFT)
+    return max(-EVAL_LIMIT, min(EVAL_LIMIT, score))
+
+
+@njit(cache=True, nogil=True)
+def _negamax_kernel(
+    board, player, alpha, beta, depth, free, h,
+    lines, through_start, through, order, zobrist,
+    tt_key, tt_data, tt_mask, killers, stats, node_limit,
+):
+    stats[0] += 1
+    if stats[0] > node_limit:
+        stats[1] = 1
+        return 0
+    if depth == 0:
+        return _evaluate_kernel(board, player, lines)
+
+    alpha_orig = alpha
+    tt_move = -1
+    slot = np.int64(h & tt_mask)
+    if tt_key[slot] == h:
+        tt_move = tt_data[slot, 3]
+        if tt_data[slot, 0] >= depth:
+            tt_value = tt_data[slot, 1]
+            tt_flag = tt_data[slot, 2]
+            if tt_flag == TT_EXACT:
+                return tt_value
+            if tt_flag == TT_LOWER:
+                alpha = max(alpha, tt_value)
+            else:
+                beta = min(beta, tt_value)
+            if alpha >= beta:
+                return tt_value
+
+    opponent = 3 - player
+    best = -INF
+    best_move = -1
+    killer1 = killers[depth, 0]
+    killer2 = killers[depth, 1]
+    # j == -3 — ход из таблицы транспозиций, j == -2, -1 — ходы-убийцы,
+    # далее — общий порядок перебора без уже проверенных ходов
+    for j in range(-3, order.shape[0]):
+        if j == -3:
+            idx = tt_move
+        elif j < 0:
+            idx = killers[depth, j + 2]
+            if idx == tt_move:
+                continue
+        else:
+            idx = order[j]
+            if idx == tt_move or idx == killer1 or idx == killer2:
+                continue
+        if idx < 0 or board[idx] != 0:
+            continue
+
+        board[idx] = player
+        if _wins_at_kernel(board, idx, player, lines, through_start, through):
+            score = WIN_SCORE
+        elif free == 1:
+            score = 0
+        else:
+            score = -_negamax_kernel(
+                board, opponent, -beta, -alpha, depth - 1, free - 1,
+                h ^ zobrist[idx, player - 1],
+                lines, through_start, through, order, zobrist,
+                tt_key, tt_data, tt_mask, killers, stats, node_limit,
+            )
+        board[idx] = 0
+        if stats[1]:
+            return 0
+
+        if score > WIN_THRESHOLD:
+            score -= 1
+        elif score < -WIN_THRESHOLD:
+            score += 1
+
+        if score > best:
+            best = score
+            best_move = idx
+        if best > alpha:
+            alpha = best
+        if alpha >= beta:
+            if killers[depth, 0] != idx:
+                killers[depth, 1] = killers[depth, 0]
+                killers[depth, 0] = idx
+            break
+
+    if best <= alpha_orig:
+        flag = TT_UPPER
+    elif best >= beta:
+        flag = TT_LOWER
+    else:
+        flag = TT_EXACT
+    tt_key[slot] = h
+    tt_data[slot, 0] = depth
+    tt_data[slot, 1] = best
+    tt_data[slot, 2] = flag
+    tt_data[slot, 3] = best_move
+    return best
+
+
+class KernelArrays(NamedTuple):
+    """Массивы NumPy, которые GameState.search передаёт в _negamax_kernel."""
+
+    lines: "np.ndarray"
+    through_start: "np.ndarray"
+    through: "np.ndarray"
+    order: "np.ndarray"
+    zobrist: "np.ndarray"
+    tt_key: "np.ndarray"
+    tt_data: "np.ndarray"
+    killers: "np.ndarray"
 
 
 class GameState:
@@ -24,6 +230,11 @@ class GameState:
     win_length — сколько фигур подряд нужно для победы (k, 1 <= k <= n)
     """
 
+    # (size, win_length) -> сгенерированные проверки победы (см. _specialize)
+    _win_check_cache: Dict[Tuple[int, int], Tuple[Callable[[int], int], ...]] = {}
+    # size -> 8 симметрий квадрата (perm, inverse), см. canonical_key
+    _symmetry_cache: Dict[int, List[Tuple[List[int], List[int]]]] = {}
+
     def __init__(
         self,
         size: int,
@@ -33,7 +244,19 @@ class GameState:
     ):
         self.size = size
         self.win_length = win_length
-        self.board: List[List[str]] = [["." for _ in range(size)] for _ in range(size)]
+        # поле хранится как две битовые маски (по одной на игрока):
+        # клетка (r, c) соответствует биту r * size + c
+        self.x_bits: int = 0
+        self.o_bits: int = 0
+        self.full_mask: int = (1 << (size * size)) - 1
+        # то же поле плоским массивом байт (0 — пусто, 1 — X, 2 — O):
+        # быстрый cell() и готовый буфер для numba-ядра
+        self.cells = bytearray(size * size)
+        self.moves_played = 0  # число занятых клеток
+        self._build_line_masks()
+        self._win_checks: Optional[Tuple[Callable[[int], int], ...]] = None
+        if size <= SPECIALIZE_MAX_SIZE:
+            self._win_checks = self._specialize(size, win_length)
         self.human_plays_x = human_plays_x
         self.current_player_x = human_starts if human_plays_x else not human_starts
         # флаг, чей сейчас ход человек (True) или компьютер (False)
@@ -41,8 +264,160 @@ class GameState:
         self.winner: Optional[str] = None  # 'X', 'O' или 'D' (ничья)
         self.win_line: Optional[Tuple[Tuple[int, int], Tuple[int, int]]] = None
 
+        # хэш Зобриста позиции: zobrist[idx] — ключи (для X, для O) клетки idx
+        self.zobrist: List[Tuple[int, int]] = [
+            (random.getrandbits(64), random.getrandbits(64)) for _ in range(size * size)
+        ]
+        self.hash: int = 0
+        # таблица транспозиций: hash -> (depth, value, flag, best_move)
+        self.tt: Dict[int, Tuple[int, int, int, int]] = {}
+        # порядок перебора клеток в поиске — от центра к краям
+        center = (size - 1) / 2
+        self._move_order: List[int] = sorted(
+            range(size * size),
+            key=lambda i: (i // size - center) ** 2 + (i % size - center) ** 2,
+        )
+        # ходы-убийцы: _killers[depth] — два последних хода, давших отсечение
+        self._killers: List[List[int]] = [[-1, -1] for _ in range(size * size + 1)]
+        self._deadline: Optional[float] = None
+        self._nodes = 0
+        # история ходов для undo_move: (r, c, winner, win_line, hash) до хода
+        self._undo_stack: List[
+            Tuple[int, int, Optional[str], Optional[Tuple[Tuple[int, int], Tuple[int, int]]], int]
+        ] = []
+        # массивы для numba-ядра создаются при первом поиске
+        self._kernel_arrays: Optional[KernelArrays] = None
+        self._kernel_rate = 200_000.0  # оценка скорости ядра, узлов в секунду
+
+    def _build_line_masks(self) -> None:
+        """Предрасчёт всех линий из win_length клеток подряд.
+
+        line_masks[i]    — битовая маска i-й линии,
+        line_ends[i]     — её концы ((r1, c1), (r2, c2)),
+        line_dirs[i]     — направление (dr, dc) от первого конца ко второму,
+        lines_through[j] — номера линий, проходящих через клетку с индексом j.
+        """
+        n = self.size
+        k = self.win_length
+        self.line_masks: List[int] = []
+        self.line_cells: List[List[int]] = []
+        self.line_ends: List[Tuple[Tuple[int, int], Tuple[int, int]]] = []
+        self.line_dirs: List[Tuple[int, int]] = []
+        self.lines_through: List[List[int]] = [[] for _ in range(n * n)]
+
+        seen = set()
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for r in range(n):
+                for c in range(n):
+                    end_r = r + dr * (k - 1)
+                    end_c = c + dc * (k - 1)
+                    if not (0 <= end_r < n and 0 <= end_c < n):
+                        continue
+                    cells = [(r + dr * i) * n + (c + dc * i) for i in range(k)]
+                    mask = 0
+                    for idx in cells:
+                        mask |= 1 << idx
+                    # при k == 1 все направления дают одну и ту же линию
+                    if mask in seen:
+                        continue
+                    seen.add(mask)
+                    line = len(self.line_masks)
+                    self.line_masks.append(mask)
+                    self.line_cells.append(cells)
+                    self.line_ends.append(((r, c), (end_r, end_c)))
+                    self.line_dirs.append((dr, dc))
+                    for idx in cells:
+                        self.lines_through[idx].append(line)
+
+    def _specialize(self, size: int, k: int) -> Tuple[Callable[[int], int], ...]:
+        """Сгенерировать для каждой клетки функцию проверки победы.
+
+        win_checks[idx](bits) возвращает номер линии из k фигур через клетку
+        idx, целиком занятой bits, или -1. Маски линий подставлены в код
+        константами, цикл по lines_through развёрнут. Результат кэшируется
+        на уровне класса по (size, k).
+        """
+        key = (size, k)
+        checks = GameState._win_check_cache.get(key)
+        if checks is not None:
+            return checks
+
+        source: List[str] = []
+        for idx in range(size * size):
+            source.append(f"def win_at_{idx}(bits):")
+            for line in self.lines_through[idx]:
+                mask = self.line_masks[line]
+                source.append(f"    if bits & {mask:#x} == {mask:#x}: return {line}")
+            source.append("    return -1")
+        namespace: Dict[str, Callable[[int], int]] = {}
+        exec("\n".join(source), namespace)
+        checks = tuple(namespace[f"win_at_{idx}"] for idx in range(size * size))
+        GameState._win_check_cache[key] = checks
+        return checks
+
+    @staticmethod
+    def _symmetries(size: int) -> List[Tuple[List[int], List[int]]]:
+        """8 преобразований поля (повороты и отражения) как перестановки клеток.
+
+        perm[idx] — куда переходит клетка idx, inverse — обратная перестановка.
+        """
+        symmetries = GameState._symmetry_cache.get(size)
+        if symmetries is not None:
+            return symmetries
+
+        last = size - 1
+        transforms = (
+            lambda r, c: (r, c),
+            lambda r, c: (c, last - r),
+            lambda r, c: (last - r, last - c),
+            lambda r, c: (last - c, r),
+            lambda r, c: (r, last - c),
+            lambda r, c: (last - r, c),
+            lambda r, c: (c, r),
+            lambda r, c: (last - c, last - r),
+        )
+        symmetries = []
+        for transform in transforms:
+            perm = [0] * (size * size)
+            inverse = [0] * (size * size)
+            for idx in range(size * size):
+                r, c = transform(*divmod(idx, size))
+                perm[idx] = r * size + c
+                inverse[r * size + c] = idx
+            symmetries.append((perm, inverse))
+        GameState._symmetry_cache[size] = symmetries
+        return symmetries
+
+    def canonical_key(self) -> Tuple[bytes, int]:
+        """Ключ позиции, одинаковый для всех её поворотов и отражений.
+
+        Возвращает (ключ, номер симметрии в _symmetries), переводящей
+        текущее поле в каноническое. Ключ включает игрока, чей сейчас ход.
+        """
+        mover = b"X" if self.current_player_x else b"O"
+        best_key = b""
+        best_t = -1
+        for t, (_, inverse) in enumerate(self._symmetries(self.size)):
+            key = bytes(map(self.cells.__getitem__, inverse)) + mover
+            if best_t < 0 or key < best_key:
+                best_key = key
+                best_t = t
+        return best_key, best_t
+
+    def to_canonical(self, idx: int, t: int) -> int:
+        """Номер клетки idx после симметрии t (см. canonical_key)."""
+        return self._symmetries(self.size)[t][0][idx]
+
+    def from_canonical(self, idx: int, t: int) -> int:
+        """Номер клетки, переходящей в idx при симметрии t."""
+        return self._symmetries(self.size)[t][1][idx]
+
     def cell(self, r: int, c: int) -> str:
-        return self.board[r][c]
+        return CELL_SYMBOLS[self.cells[r * self.size + c]]
+
+    def bits_of(self, symbol: str) -> int:
+        """Битовая маска клеток, занятых symbol."""
+        return self.x_bits if symbol == "X" else self.o_bits
 
     def make_move(self, r: int, c: int) -> bool:
         """Сделать ход в клетку (r, c). Возвращает True, если ход удался."""
@@ -50,11 +425,14 @@ class GameState:
             return False
         if not (0 <= r < self.size and 0 <= c < self.size):
             return False
-        if self.board[r][c] != ".":
+        idx = r * self.size + c
+        if ((self.x_bits | self.o_bits) >> idx) & 1:
             return False
 
         symbol = "X" if self.current_player_x else "O"
-        self.board[r][c] = symbol
+        self._undo_stack.append((r, c, self.winner, self.win_line, self.hash))
+        self._toggle(idx, symbol == "X")
+        self.moves_played += 1
         self._update_winner_after_move(r, c, symbol)
 
         # смена игрока, если игра не закончилась
@@ -63,6 +441,43 @@ class GameState:
             self.human_turn = not self.human_turn
         return True
 
+    def undo_move(self, r: int, c: int) -> None:
+        """Отменить последний ход, сделанный в клетку (r, c).
+
+        Ходы отменяются строго в обратном порядке (LIFO): (r, c) обязан быть
+        последним ходом, иначе выбрасывается ValueError.
+        """
+        if not self._undo_stack or self._undo_stack[-1][:2] != (r, c):
+            raise ValueError(f"Клетка ({r}, {c}) не является последним ходом.")
+        _, _, prev_winner, prev_win_line, prev_hash = self._undo_stack.pop()
+
+        # игрок не менялся только если ход завершил игру
+        if self.winner is None:
+            self.current_player_x = not self.current_player_x
+            self.human_turn = not self.human_turn
+
+        idx = r * self.size + c
+        if self.current_player_x:
+            self.x_bits ^= 1 << idx
+        else:
+            self.o_bits ^= 1 << idx
+        self.cells[idx] = 0
+        self.hash = prev_hash
+        self.moves_played -= 1
+        self.winner = prev_winner
+        self.win_line = prev_win_line
+
+    def _toggle(self, idx: int, is_x: bool) -> None:
+        """Поставить/снять фигуру в клетке idx (XOR бита и ключа Зобриста)."""
+        if is_x:
+            self.x_bits ^= 1 << idx
+            self.cells[idx] ^= 1
+            self.hash ^= self.zobrist[idx][0]
+        else:
+            self.o_bits ^= 1 << idx
+            self.cells[idx] ^= 2
+            self.hash ^= self.zobrist[idx][1]
+
     def _update_winner_after_move(self, r: int, c: int, symbol: str) -> None:
         """Проверка победы/ничьей после хода symbol в (r, c)."""
         won, line = self._find_win_from(r, c, symbol)
@@ -72,8 +487,7 @@ class GameState:
             return
 
         # проверка ничьей (нет свободных клеток)
-        n = self.size
-        if all(self.board[i][j] != "." for i in range(n) for j in range(n)):
+        if self.moves_played == self.size * self.size:
             self.winner = "D"
             self.win_line = None
 
@@ -81,132 +495,467 @@ class GameState:
         self, r: int, c: int, symbol: str
     ) -> Tuple[bool, Optional[Tuple[Tuple[int, int], Tuple[int, int]]]]:
         """Ищет выигрышную линию длины >= win_length, проходящую через (r, c)."""
-        if self.board[r][c] != symbol:
-            return False, None
+        bits = self.bits_of(symbol)
+        if self._win_checks is not None:
+            line = self._win_checks[r * self.size + c](bits)
+            if line < 0:
+                return False, None
+            return True, self._full_run(line, bits)
+
+        line_masks = self.line_masks
+        for line in self.lines_through[r * self.size + c]:
+            mask = line_masks[line]
+            if (bits & mask) == mask:
+                return True, self._full_run(line, bits)
 
-        n = self.size
-        k = self.win_length
-
-        def count_in_direction(dr: int, dc: int) -> Tuple[int, Tuple[int, int], Tuple[int, int]]:
-            count = 1
-            start_r, start_c = r, c
-            end_r, end_c = r, c
+        return False, None
 
-            # вперёд
-            rr, cc = r + dr, c + dc
-            while 0 <= rr < n and 0 <= cc < n and self.board[rr][cc] == symbol:
-                count += 1
-                end_r, end_c = rr, cc
-                rr += dr
-                cc += dc
+    def _full_run(
+        self, line: int, bits: int
+    ) -> Tuple[Tuple[int, int], Tuple[int, int]]:
+        """Концы всего ряда фигур bits, содержащего линию line.
 
-            # назад
-            rr, cc = r - dr, c - dc
-            while 0 <= rr < n and 0 <= cc < n and self.board[rr][cc] == symbol:
-                count += 1
-                start_r, start_c = rr, cc
-                rr -= dr
-                cc -= dc
+        Линия — ровно win_length клеток; ряд продолжается в обе стороны,
+        пока в клетках стоят фигуры того же игрока.
+        """
+        n = self.size
+        (start_r, start_c), (end_r, end_c) = self.line_ends[line]
+        dr, dc = self.line_dirs[line]
+
+        # вперёд
+        rr, cc = end_r + dr, end_c + dc
+        while 0 <= rr < n and 0 <= cc < n and (bits >> (rr * n + cc)) & 1:
+            end_r, end_c = rr, cc
+            rr += dr
+            cc += dc
+
+        # назад
+        rr, cc = start_r - dr, start_c - dc
+        while 0 <= rr < n and 0 <= cc < n and (bits >> (rr * n + cc)) & 1:
+            start_r, start_c = rr, cc
+            rr -= dr
+            cc -= dc
+
+        return (start_r, start_c), (end_r, end_c)
+
+    def evaluate(self) -> int:
+        """Эвристическая оценка позиции с точки зрения игрока, чей сейчас ход.
+
+        Каждая линия, занятая только одним игроком, даёт ему 4^(число фигур)
+        (не больше 2^EVAL_MAX_SHIFT); итог ограничен по модулю EVAL_LIMIT.
+        """
+        if self.current_player_x:
+            own, opp = self.x_bits, self.o_bits
+        else:
+            own, opp = self.o_bits, self.x_bits
+        score = 0
+        for mask in self.line_masks:
+            mine = own & mask
+            theirs = opp & mask
+            if mine and not theirs:
+                score += 1 << min(2 * bin(mine).count("1"), EVAL_MAX_SHIFT)
+            elif theirs and not mine:
+                score -= 1 << min(2 * bin(theirs).count("1"), EVAL_MAX_SHIFT)
+        return max(-EVAL_LIMIT, min(EVAL_LIMIT, score))
+
+    def _ordered_moves(self, occupied: int, first: int, depth: int = 0) -> List[int]:
+        """Свободные клетки в порядке перебора.
+
+        Первым идёт first (ход из TT), затем ходы-убийцы глубины depth,
+        затем остальные клетки от центра к краям.
+        """
+        priority = [first] + self._killers[depth] if depth else [first]
+        head: List[int] = []
+        for i in priority:
+            if i >= 0 and i not in head and not (occupied >> i) & 1:
+                head.append(i)
+        return head + [
+            i for i in self._move_order if i not in head and not (occupied >> i) & 1
+        ]
+
+    def reset_killers(self) -> None:
+        """Забыть ходы-убийцы (они имеют смысл только в пределах одного поиска)."""
+        for slot in self._killers:
+            slot[0] = slot[1] = -1
+        if self._kernel_arrays is not None:
+            self._kernel_arrays.killers.fill(-1)
+
+    def negamax(self, alpha: int, beta: int, depth: int) -> int:
+        """Negamax с alpha-beta отсечением и таблицей транспозиций.
+
+        Возвращает оценку позиции для игрока, чей сейчас ход. Победа через
+        d полуходов оценивается как WIN_SCORE - d, так что быстрые победы
+        предпочтительнее. Лучший найденный ход сохраняется в self.tt.
+        """
+        self._nodes += 1
+        if (
+            self._deadline is not None
+            and not self._nodes & 1023
+            and time.perf_counter() > self._deadline
+        ):
+            raise SearchTimeout
+
+        if depth == 0:
+            return self.evaluate()
+
+        alpha_orig = alpha
+        tt_move = -1
+        entry = self.tt.get(self.hash)
+        if entry is not None:
+            tt_depth, tt_value, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if tt_flag == TT_EXACT:
+                    return tt_value
+                if tt_flag == TT_LOWER:
+                    alpha = max(alpha, tt_value)
+                else:
+                    beta = min(beta, tt_value)
+                if alpha >= beta:
+                    return tt_value
 
-            return count, (start_r, start_c), (end_r, end_c)
+        n = self.size
+        best = -INF
+        best_move = -1
+        for idx in self._ordered_moves(self.x_bits | self.o_bits, tt_move, depth):
+            r, c = divmod(idx, n)
+            self.make_move(r, c)
+            try:
+                if self.winner is None:
+                    score = -self.negamax(-beta, -alpha, depth - 1)
+                elif self.winner == "D":
+                    score = 0
+                else:
+                    score = WIN_SCORE
+            finally:
+                # при SearchTimeout поле тоже возвращается в исходное состояние
+                self.undo_move(r, c)
+
+            # форсированный результат на ход дальше — на единицу "дешевле"
+            if score > WIN_THRESHOLD:
+                score -= 1
+            elif score < -WIN_THRESHOLD:
+                score += 1
+
+            if score > best:
+                best = score
+                best_move = idx
+            if best > alpha:
+                alpha = best
+            if alpha >= beta:
+                killers = self._killers[depth]
+                if killers[0] != idx:
+                    killers[1] = killers[0]
+                    killers[0] = idx
+                break
+
+        if best <= alpha_orig:
+            flag = TT_UPPER
+        elif best >= beta:
+            flag = TT_LOWER
+        else:
+            flag = TT_EXACT
+        if len(self.tt) >= TT_MAX_ENTRIES:
+            self.tt.clear()
+        self.tt[self.hash] = (depth, best, flag, best_move)
+        return best
+
+    def search(self, depth: int) -> Tuple[int, int]:
+        """Поиск на глубину depth: (оценка, индекс лучшего хода).
+
+        При наличии numba считает ядро _negamax_kernel, иначе — negamax.
+        Если задан self._deadline и время вышло, выбрасывает SearchTimeout.
+        """
+        if not HAVE_NUMBA:
+            score = self.negamax(-INF, INF, depth)
+            return score, self.tt[self.hash][3]
+
+        first_call = self._kernel_arrays is None
+        if first_call:
+            self._kernel_arrays = self._build_kernel_arrays()
+        arrays = self._kernel_arrays
+        tt_key, tt_data = arrays.tt_key, arrays.tt_data
 
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
+        n = self.size
+        # ядро меняет поле на месте, поэтому ему передаётся копия
+        board = np.frombuffer(self.cells, dtype=np.uint8).copy()
+        free = n * n - self.moves_played
+        player = 1 if self.current_player_x else 2
+        h = np.uint64(self.hash)
+        tt_mask = np.uint64(tt_key.shape[0] - 1)
+
+        if first_call:
+            # прогрев: первый вызов включает JIT-компиляцию ядра, и его время
+            # не должно попасть в оценку скорости _kernel_rate
+            _negamax_kernel(
+                board, player, -INF, INF, 0, free, h,
+                arrays.lines, arrays.through_start, arrays.through, arrays.order,
+                arrays.zobrist, tt_key, tt_data, tt_mask, arrays.killers,
+                np.zeros(2, dtype=np.int64), 1,
+            )
+
+        if self._deadline is None:
+            node_limit = 1 << 62
+        else:
+            remaining = self._deadline - time.perf_counter()
+            if remaining <= 0:
+                raise SearchTimeout
+            node_limit = max(1000, int(remaining * KERNEL_TIME_MARGIN * self._kernel_rate))
+
+        stats = np.zeros(2, dtype=np.int64)
+        started = time.perf_counter()
+        score = _negamax_kernel(
+            board, player, -INF, INF, depth, free, h,
+            arrays.lines, arrays.through_start, arrays.through, arrays.order,
+            arrays.zobrist, tt_key, tt_data, tt_mask, arrays.killers, stats, node_limit,
+        )
+        elapsed = time.perf_counter() - started
+        # короткие вызовы измеряют в основном накладные расходы, но вызов,
+        # упёршийся в node_limit, обязан обновить оценку — иначе заниженная
+        # скорость так и будет ограничивать поиск
+        if elapsed > 0 and (stats[1] or elapsed > 0.01):
+            self._kernel_rate = stats[0] / elapsed
+        if stats[1]:
+            raise SearchTimeout
+        return int(score), int(tt_data[int(h & tt_mask), 3])
+
+    def iterative_search(self, time_limit: float) -> Tuple[int, bool]:
+        """Итеративное углубление, пока не истечёт time_limit секунд.
+
+        Возвращает (индекс лучшего хода, завершён ли поиск). Поиск завершён,
+        если найден форсированный результат или просмотрены все свободные
+        клетки; иначе ход взят из последней итерации, уложившейся во время.
+        """
+        free = self.size * self.size - self.moves_played
+        best_move = self._ordered_moves(self.x_bits | self.o_bits, -1)[0]
+        self.reset_killers()
+        self._deadline = time.perf_counter() + time_limit
+        try:
+            for depth in range(1, free + 1):
+                try:
+                    score, move = self.search(depth)
+                except SearchTimeout:
+                    return best_move, False
+                best_move = move
+                if abs(score) > WIN_THRESHOLD:
+                    return best_move, True
+        finally:
+            self._deadline = None
+        return best_move, True
+
+    def _build_kernel_arrays(self) -> KernelArrays:
+        """Перевести линии, порядок ходов, ключи Зобриста и таблицы поиска в массивы NumPy."""
+        n = self.size
+        lines = np.array(self.line_cells, dtype=np.int64).reshape(-1, self.win_length)
+        through_start = np.zeros(n * n + 1, dtype=np.int64)
+        for idx in range(n * n):
+            through_start[idx + 1] = through_start[idx] + len(self.lines_through[idx])
+        through = np.array(
+            [line for lines_of_cell in self.lines_through for line in lines_of_cell],
+            dtype=np.int64,
+        )
+        order = np.array(self._move_order, dtype=np.int64)
+        zobrist = np.array(self.zobrist, dtype=np.uint64)
+        tt_key = np.zeros(1 << KERNEL_TT_BITS, dtype=np.uint64)
+        tt_data = np.zeros((1 << KERNEL_TT_BITS, 4), dtype=np.int64)
+        killers = np.full((n * n + 1, 2), -1, dtype=np.int64)
+        return KernelArrays(lines, through_start, through, order, zobrist, tt_key, tt_data, killers)
 
-        for dr, dc in directions:
-            cnt, start, end = count_in_direction(dr, dc)
-            if cnt >= k:
-                return True, (start, end)
+    def available_moves(self) -> List[Tuple[int, int]]:
+        n = self.size
+        moves: List[Tuple[int, int]] = []
+        free = ~(self.x_bits | self.o_bits) & self.full_mask
+        while free:
+            low = free & -free  # младший установленный бит
+            idx = low.bit_length() - 1
+            moves.append(divmod(idx, n))
+            free ^= low
+        return moves
 
-        return False, None
 
-    def available_moves(self) -> List[Tuple[int, int]]:
-        return [(r, c) for r in range(self.size)
-                for c in range(self.size)
-                if self.board[r][c] == "."]
+# (size, win_length) -> канонический ключ позиции -> ход ИИ в канонических координатах
+_ai_move_cache: Dict[Tuple[int, int], "OrderedDict[bytes, int]"] = {}
 
 
 def ai_choose_move(game: GameState) -> Optional[Tuple[int, int]]:
     """
-    Простейший ИИ:
-    1. Если есть выигрышный ход — делает его.
-    2. Если есть ход, который блокирует немедленную победу соперника — блокирует.
-    3. Иначе — случайный свободный ход.
+    ИИ на основе negamax с alpha-beta отсечением (см. GameState.search).
+    Поиск ведётся итеративным углублением (GameState.iterative_search),
+    пока не истечёт AI_TIME_LIMIT или не будет найден форсированный
+    результат. Лучший ход предыдущей
+    итерации (из таблицы транспозиций) проверяется первым на следующей,
+    за ним — ходы-убийцы, давшие отсечение на той же глубине.
+
+    Ходы завершённых поисков запоминаются по каноническому ключу позиции
+    (GameState.canonical_key), так что симметричные позиции — в том числе
+    в следующих партиях с теми же n и k — повторно не просчитываются.
+    Ходы поисков, прерванных по времени, не кэшируются.
     """
-    moves = game.available_moves()
-    if not moves:
+    if game.moves_played == game.size * game.size:
         return None
 
-    ai_symbol = "X" if game.current_player_x else "O"
-    human_symbol = "O" if ai_symbol == "X" else "X"
-
-    def is_winning_move(r: int, c: int, symbol: str) -> bool:
-        # временно ставим символ и используем общую логику поиска k-в-ряд
-        game.board[r][c] = symbol
-        win, _ = game._find_win_from(r, c, symbol)
-        game.board[r][c] = "."
-        return win
+    cache = _ai_move_cache.setdefault((game.size, game.win_length), OrderedDict())
+    key, t = game.canonical_key()
+    cached = cache.get(key)
+    if cached is not None:
+        cache.move_to_end(key)
+        return divmod(game.from_canonical(cached, t), game.size)
 
-    # 1. Попробовать выиграть
-    for r, c in moves:
-        if is_winning_move(r, c, ai_symbol):
-            return r, c
+    best_move, complete = game.iterative_search(AI_TIME_LIMIT)
+    # ход кэшируется, только если поиск завершён
+    if complete:
+        if len(cache) >= AI_CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+        cache[key] = game.to_canonical(best_move, t)
+    return divmod(best_move, game.size)
 
-    # 2. Попробовать заблокировать соперника
-    for r, c in moves:
-        if is_winning_move(r, c, human_symbol):
-            return r, c
 
-    # 3. Иначе — случайный ход
-    return random.choice(moves)
+class BoardRenderer:
+    """Отрисовка поля.
 
+    Хранит поверхности, которые не нужно перерисовывать каждый кадр,
+    и области экрана, изменившиеся с прошлого показа.
+    """
 
-def draw_board(
-    screen: pygame.Surface,
-    game: GameState,
-    font: pygame.font.Font,
-    allow_restart_hint: bool = True,
-) -> None:
-    screen.fill(BG_COLOR)
-    width, height = screen.get_size()
-    n = game.size
-
-    # вычисляем размер клетки
-    cell_size = min(width, height) // n
-    offset_x = (width - cell_size * n) // 2
-    offset_y = (height - cell_size * n) // 2
-
-    # линии сетки
-    for i in range(n + 1):
-        # вертикальные
-        x = offset_x + i * cell_size
-        pygame.draw.line(screen, LINE_COLOR, (x, offset_y), (x, offset_y + n * cell_size), 2)
-        # горизонтальные
-        y = offset_y + i * cell_size
-        pygame.draw.line(screen, LINE_COLOR, (offset_x, y), (offset_x + n * cell_size, y), 2)
-
-    # фигуры
-    for r in range(n):
-        for c in range(n):
-            val = game.cell(r, c)
-            if val == ".":
-                continue
-            center_x = offset_x + c * cell_size + cell_size // 2
-            center_y = offset_y + r * cell_size + cell_size // 2
-            if val == "X":
-                draw_x(screen, center_x, center_y, cell_size // 2 - 10)
-            elif val == "O":
-                draw_o(screen, center_x, center_y, cell_size // 2 - 10)
-
-    # линия выигрыша
-    if game.win_line is not None:
-        (r1, c1), (r2, c2) = game.win_line
-        x1 = offset_x + c1 * cell_size + cell_size // 2
-        y1 = offset_y + r1 * cell_size + cell_size // 2
-        x2 = offset_x + c2 * cell_size + cell_size // 2
-        y2 = offset_y + r2 * cell_size + cell_size // 2
-        pygame.draw.line(screen, WIN_LINE_COLOR, (x1, y1), (x2, y2), 6)
-
-    # сообщение о статусе
+    def __init__(self, font: pygame.font.Font):
+        self.font = font
+        # сообщение -> отрисованный текст (font.render — дорогая операция)
+        self._text_cache: Dict[str, pygame.Surface] = {}
+        # фон с сеткой и готовые фигуры; пересоздаются при смене размера окна/поля
+        self._prepared_for: Optional[Tuple[Tuple[int, int], int]] = None
+        self._bg: Optional[pygame.Surface] = None
+        self._x_surf: Optional[pygame.Surface] = None
+        self._o_surf: Optional[pygame.Surface] = None
+        # разметка поля (cell_size, offset_x, offset_y) и прямоугольники клеток
+        self.layout: Tuple[int, int, int] = (0, 0, 0)
+        self._cell_rects: List[pygame.Rect] = []
+        # области экрана, изменившиеся с прошлого кадра, и то, что было нарисовано
+        self._dirty: List[pygame.Rect] = []
+        self._drawn: Optional[Tuple[int, int, str]] = None  # (x_bits, o_bits, message)
+        self._text_rect: Optional[pygame.Rect] = None
+        self._win_rect: Optional[pygame.Rect] = None
+
+    def prepare(self, screen: pygame.Surface, n: int) -> Tuple[int, int, int]:
+        """Отрисовать фон с сеткой и фигуры X/O под текущий размер окна.
+
+        Возвращает разметку поля (cell_size, offset_x, offset_y).
+        """
+        key = (screen.get_size(), n)
+        if key == self._prepared_for:
+            return self.layout
+        self._prepared_for = key
+        # после смены размера перерисовывается и показывается весь экран
+        self._drawn = None
+        self._dirty = [screen.get_rect()]
+
+        width, height = screen.get_size()
+        cell_size = min(width, height) // n
+        offset_x = (width - cell_size * n) // 2
+        offset_y = (height - cell_size * n) // 2
+        self.layout = (cell_size, offset_x, offset_y)
+        self._cell_rects = [
+            pygame.Rect(offset_x + c * cell_size, offset_y + r * cell_size, cell_size, cell_size)
+            for r in range(n)
+            for c in range(n)
+        ]
+
+        bg = pygame.Surface((width, height))
+        bg.fill(BG_COLOR)
+        for i in range(n + 1):
+            # вертикальные
+            x = offset_x + i * cell_size
+            pygame.draw.line(bg, LINE_COLOR, (x, offset_y), (x, offset_y + n * cell_size), 2)
+            # горизонтальные
+            y = offset_y + i * cell_size
+            pygame.draw.line(bg, LINE_COLOR, (offset_x, y), (offset_x + n * cell_size, y), 2)
+        self._bg = bg.convert()
+
+        half = cell_size // 2
+        self._x_surf = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
+        draw_x(self._x_surf, half, half, half - 10)
+        self._x_surf = self._x_surf.convert_alpha()
+        self._o_surf = pygame.Surface((cell_size, cell_size), pygame.SRCALPHA)
+        draw_o(self._o_surf, half, half, half - 10)
+        self._o_surf = self._o_surf.convert_alpha()
+        return self.layout
+
+    def text(self, message: str) -> pygame.Surface:
+        surface = self._text_cache.get(message)
+        if surface is None:
+            if len(self._text_cache) >= TEXT_CACHE_LIMIT:
+                # удаляем самую старую запись
+                del self._text_cache[next(iter(self._text_cache))]
+            surface = self.font.render(message, True, TEXT_COLOR)
+            self._text_cache[message] = surface
+        return surface
+
+    def invalidate(self) -> None:
+        """Сбросить кэш фона: следующий кадр будет отрисован и показан целиком."""
+        self._prepared_for = None
+
+    def draw(
+        self, screen: pygame.Surface, game: GameState, allow_restart_hint: bool = True
+    ) -> None:
+        """Нарисовать поле и запомнить изменившиеся области для present().
+
+        Если с прошлого кадра не изменились ни фигуры, ни статус, ничего не рисуется.
+        """
+        n = game.size
+        cell_size, offset_x, offset_y = self.prepare(screen, n)
+        cell_rects = self._cell_rects
+        message = status_message(game, allow_restart_hint)
+
+        # с прошлого кадра ничего не изменилось — перерисовывать нечего
+        state = (game.x_bits, game.o_bits, message)
+        drawn = self._drawn
+        if state == drawn:
+            return
+        dirty = self._dirty
+        if drawn is not None:
+            changed = (game.x_bits ^ drawn[0]) | (game.o_bits ^ drawn[1])
+            while changed:
+                low = changed & -changed
+                dirty.append(cell_rects[low.bit_length() - 1])
+                changed ^= low
+            # старые линия выигрыша и статус стираются вместе с новыми
+            if self._win_rect is not None:
+                dirty.append(self._win_rect)
+            if self._text_rect is not None:
+                dirty.append(self._text_rect)
+        self._drawn = state
+
+        # фон с линиями сетки
+        screen.blit(self._bg, (0, 0))
+
+        # фигуры
+        for idx, val in enumerate(game.cells):
+            if val == 1:
+                screen.blit(self._x_surf, cell_rects[idx])
+            elif val == 2:
+                screen.blit(self._o_surf, cell_rects[idx])
+
+        # линия выигрыша
+        self._win_rect = None
+        if game.win_line is not None:
+            (r1, c1), (r2, c2) = game.win_line
+            x1 = offset_x + c1 * cell_size + cell_size // 2
+            y1 = offset_y + r1 * cell_size + cell_size // 2
+            x2 = offset_x + c2 * cell_size + cell_size // 2
+            y2 = offset_y + r2 * cell_size + cell_size // 2
+            self._win_rect = pygame.draw.line(screen, WIN_LINE_COLOR, (x1, y1), (x2, y2), 6)
+            dirty.append(self._win_rect)
+
+        self._text_rect = screen.blit(self.text(message), (20, 10))
+        dirty.append(self._text_rect)
+
+    def present(self) -> None:
+        """Показать на экране только изменившиеся области (если они есть)."""
+        if self._dirty:
+            pygame.display.update(self._dirty)
+            self._dirty.clear()
+
+
+def status_message(game: GameState, allow_restart_hint: bool = True) -> str:
+    """Строка статуса: чей ход или итог партии."""
     message = ""
     if game.winner is None:
         current = "X" if game.current_player_x else "O"
@@ -227,9 +976,7 @@ def draw_board(
             message = base + " Нажмите R — новая игра, Esc — выход."
         else:
             message = base
-
-    text_surface = font.render(message, True, (0, 0, 0))
-    screen.blit(text_surface, (20, 10))
+    return message
 
 
 def draw_x(screen: pygame.Surface, cx: int, cy: int, radius: int) -> None:
@@ -252,8 +999,7 @@ def run_pygame_game(size: int, win_length: int, human_starts: bool) -> None:
     pygame.init()
     pygame.display.set_caption("Крестики-нолики (pygame)")
     screen = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE))
-    clock = pygame.time.Clock()
-    font = pygame.font.SysFont(None, 28)
+    renderer = BoardRenderer(pygame.font.SysFont(None, 28))
 
     # внешний цикл — позволяет перезапускать игру без выхода из приложения
     running = True
@@ -271,16 +1017,32 @@ def run_pygame_game(size: int, win_length: int, human_starts: bool) -> None:
 
         round_active = True
         while round_active and running:
+            # перед ходом компьютера и перед ожиданием человека показываем
+            # актуальное поле (например, после рестарта)
+            renderer.draw(screen, game)
+            renderer.present()
+
             # ход компьютера
             if game.winner is None and not game.human_turn:
                 move = ai_choose_move(game)
                 if move is not None:
                     game.make_move(*move)
-
-            for event in pygame.event.get():
+                # клики, сделанные пока компьютер думал, относятся к полю,
+                # которого человек ещё не видел, — отбрасываем их
+                pygame.event.clear(pygame.MOUSEBUTTONDOWN)
+                events = pygame.event.get()
+            else:
+                # ждём действий человека: поток спит, пока нет событий
+                events = [pygame.event.wait(EVENT_WAIT_MS)] + pygame.event.get()
+
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                     round_active = False
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.VIDEORESIZE):
+                    # содержимое окна потеряно (например, после сворачивания)
+                    # или изменился его размер — разметку нужно пересчитать
+                    renderer.invalidate()
                 elif event.type == pygame.KEYDOWN:
                     if game.winner is not None:
                         if event.key == pygame.K_r:
@@ -299,21 +1061,20 @@ def run_pygame_game(size: int, win_length: int, human_starts: bool) -> None:
                     and game.winner is None
                     and game.human_turn
                 ):
-                    handle_mouse_click(game, event.pos, screen.get_size())
+                    handle_mouse_click(game, event.pos, renderer.prepare(screen, game.size))
 
-            draw_board(screen, game, font)
-            pygame.display.flip()
-            clock.tick(60)
+            renderer.draw(screen, game)
+            renderer.present()
 
     pygame.quit()
 
 
-def handle_mouse_click(game: GameState, pos: Tuple[int, int], window_size: Tuple[int, int]) -> None:
-    width, height = window_size
+def handle_mouse_click(
+    game: GameState, pos: Tuple[int, int], layout: Tuple[int, int, int]
+) -> None:
+    """Ход человека кликом в pos; layout — (cell_size, offset_x, offset_y) поля."""
     n = game.size
-    cell_size = min(width, height) // n
-    offset_x = (width - cell_size * n) // 2
-    offset_y = (height - cell_size * n) // 2
+    cell_size, offset_x, offset_y = layout
 
     x, y = pos
     if not (offset_x <= x < offset_x + cell_size * n and
@@ -1,9 +1,11 @@
 import sys
-import math
-from typing import List, Tuple
+import warnings
+from typing import Optional, TextIO, Tuple
 
 import matplotlib.pyplot as plt
-from matplotlib.patches import FancyArrowPatch, Circle
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.patches import Circle
 
 
 # ------------------------------------------------------------
@@ -19,20 +21,39 @@ from matplotlib.patches import FancyArrowPatch, Circle
 #   далее m строк: u v w
 #       u, v — номера вершин (0..n-1)
 #       w    — вес ребра (вещественное число)
+#   пустые строки и строки, где не ровно три поля, пропускаются
 #
 # Каждое ребро (u -> v) отображается как вектор (стрелка) от точки u к точке v.
 # Вершины располагаются равномерно по окружности.
 #
 # Использование:
-#   python3 visualize_vectors.py graph.txt
+#   python3 visualize_vectors.py graph.txt [--labels | --no-labels]
 # или без аргумента:
 #   python3 visualize_vectors.py
 #   (скрипт спросит имя файла в консоли)
 #
+# Для плотных графов часть оформления отключается: подписи весов рисуются
+# только при m <= LABEL_LIMIT (--labels/--no-labels задают это явно),
+# а при m > HEAD_LIMIT вместо стрелок с наконечниками рисуются отрезки
+# (для ориентированного графа — одним quiver).
+#
+
+LABEL_LIMIT = 200
+HEAD_LIMIT = 2000
+
+
+# рёбра как три массива одной длины m: начала u, концы v и веса w
+EdgeArrays = Tuple[np.ndarray, np.ndarray, np.ndarray]
+# строка рёбер в файле: номера вершин — целые, вес — вещественный
+EDGE_DTYPE = np.dtype([("u", np.int64), ("v", np.int64), ("w", np.float64)])
 
 
-def read_graph_from_file(filename: str) -> Tuple[int, bool, List[Tuple[int, int, float]]]:
-    """Считать граф из файла формата save_graph_to_file."""
+def read_graph_from_file(filename: str) -> Tuple[int, bool, EdgeArrays]:
+    """Считать граф из файла формата save_graph_to_file.
+
+    Рёбра разбираются numpy.loadtxt и возвращаются массивами (u, v, w).
+    Строки, где не ровно три поля, пропускаются (см. _load_edge_rows).
+    """
     with open(filename, "r", encoding="utf-8") as f:
         header = f.readline()
         if not header:
@@ -47,46 +68,61 @@ def read_graph_from_file(filename: str) -> Tuple[int, bool, List[Tuple[int, int,
         directed_flag = int(parts[2])
         directed = directed_flag != 0
 
-        edges: List[Tuple[int, int, float]] = []
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            items = line.split()
-            if len(items) != 3:
-                continue
-            u = int(items[0])
-            v = int(items[1])
-            w = float(items[2])
-            edges.append((u, v, w))
-
-        if m != len(edges):
+        data = _load_edge_rows(f)
+        edges = (data["u"], data["v"], data["w"])
+        count = data.shape[0]
+
+        if m != count:
             # не критично, просто предупредим
             print(
                 f"Предупреждение: в заголовке указано m={m}, "
-                f"но реально прочитано {len(edges)} рёбер."
+                f"но реально прочитано {count} рёбер."
             )
 
     return n, directed, edges
 
 
-def compute_positions_on_circle(n: int, radius: float = 1.0) -> List[Tuple[float, float]]:
-    """Расположить n вершин равномерно по окружности."""
+def _load_edge_rows(f: TextIO) -> np.ndarray:
+    """Прочитать строки рёбер "u v w" из f в массив записей EDGE_DTYPE.
+
+    Обычно файл разбирается одним вызовом numpy.loadtxt. Если в нём есть
+    строки не из трёх полей, разбор повторяется только по строкам из трёх
+    полей — как и раньше, остальные строки пропускаются. Нецелые номера
+    вершин, как и раньше, дают ValueError.
+    """
+    start = f.tell()
+    with warnings.catch_warnings():
+        # для графа без рёбер loadtxt предупреждает о пустом вводе
+        warnings.simplefilter("ignore", UserWarning)
+        try:
+            # comments=None: "#" — обычный символ, и строка "0 1 1 # x"
+            # остаётся строкой из пяти полей
+            return np.loadtxt(f, dtype=EDGE_DTYPE, comments=None, ndmin=1)
+        except ValueError:
+            pass
+        f.seek(start)
+        rows = (line for line in f if len(line.split()) == 3)
+        return np.loadtxt(rows, dtype=EDGE_DTYPE, comments=None, ndmin=1)
+
+
+def compute_positions_on_circle(n: int, radius: float = 1.0) -> np.ndarray:
+    """Расположить n вершин равномерно по окружности.
+
+    Возвращает массив формы (n, 2): pos[i] — координаты (x, y) вершины i.
+    """
     if n <= 0:
-        return []
-    positions: List[Tuple[float, float]] = []
-    for i in range(n):
-        angle = 2.0 * math.pi * i / n
-        x = radius * math.cos(angle)
-        y = radius * math.sin(angle)
-        positions.append((x, y))
-    return positions
+        return np.empty((0, 2))
+    angles = np.linspace(0.0, 2.0 * np.pi, n, endpoint=False)
+    return np.column_stack([radius * np.cos(angles), radius * np.sin(angles)])
 
 
 def draw_graph_vectors(
-    n: int, directed: bool, edges: List[Tuple[int, int, float]]
+    n: int, directed: bool, edges: EdgeArrays, labels: Optional[bool] = None
 ) -> None:
-    """Отрисовать вершины и рёбра как векторы."""
+    """Отрисовать вершины и рёбра как векторы.
+
+    labels — подписывать ли веса рёбер; None — только если рёбер не больше LABEL_LIMIT.
+    """
     # немного увеличим радиус и потом зафиксируем одинаковые границы осей,
     # чтобы круг не "сплющивался" и не уезжал.
     radius = 3.0
@@ -115,60 +151,79 @@ def draw_graph_vectors(
             zorder=3,
         )
 
-    # рисуем рёбра как векторы (стрелки)
-    for (u, v, w) in edges:
-        if not (0 <= u < n and 0 <= v < n):
-            continue
-
-        x1, y1 = pos[u]
-        x2, y2 = pos[v]
-
-        # слегка укоротим вектор, чтобы не залезать в центр кружков
-        dx = x2 - x1
-        dy = y2 - y1
-        length = math.hypot(dx, dy) or 1.0
-        # сколько убрать с каждого конца (в тех же единицах, что и radius),
-        # чтобы стрелка заканчивалась почти у границы кружков, а не вдалеке от них
-        shrink = node_radius * 1.1
-        if length <= 2 * shrink:
-            shrink = length * 0.25
-        scale = (length - 2 * shrink) / length
-        sx = x1 + dx * (shrink / length)
-        sy = y1 + dy * (shrink / length)
-        ex = x1 + dx * scale
-        ey = y1 + dy * scale
-
-        arrowstyle = "->" if directed else "-|>"
-        arrow = FancyArrowPatch(
-            (sx, sy),
-            (ex, ey),
-            arrowstyle=arrowstyle,
-            mutation_scale=15,
-            linewidth=1.5,
-            color="tab:gray",
-            zorder=1,
+    # рёбра рисуются двумя коллекциями (стержни и наконечники) — это намного
+    # быстрее, чем отдельный патч на каждое ребро; геометрия всех рёбер
+    # считается сразу массивами NumPy формы (m,)
+    head_length = 0.15
+    head_width = 0.06
+    u_idx, v_idx, w_arr = edges
+    m = len(u_idx)
+    valid = (u_idx >= 0) & (u_idx < n) & (v_idx >= 0) & (v_idx < n)
+    u_idx, v_idx, w_arr = u_idx[valid], v_idx[valid], w_arr[valid]
+
+    p1 = pos[u_idx]
+    d = pos[v_idx] - p1
+    # слегка укоротим вектор, чтобы не залезать в центр кружков
+    length = np.hypot(d[:, 0], d[:, 1])
+    length = np.where(length == 0, 1.0, length)
+    # сколько убрать с каждого конца (в тех же единицах, что и radius),
+    # чтобы стрелка заканчивалась почти у границы кружков, а не вдалеке от них
+    shrink0 = node_radius * 1.1
+    shrink = np.where(length <= 2 * shrink0, length * 0.25, shrink0)
+    scale = (length - 2 * shrink) / length
+    start = p1 + d * (shrink / length)[:, None]
+    end = p1 + d * scale[:, None]
+
+    # наконечник: вершина в end, основание — на head_length ближе к u
+    unit = d / length[:, None]
+    normal = np.column_stack([-unit[:, 1], unit[:, 0]])
+    base = end - unit * head_length
+    left = base + normal * head_width
+    right = base - normal * head_width
+
+    shafts = np.stack([start, end], axis=1)
+    if m > HEAD_LIMIT and directed:
+        # слишком много рёбер для отдельных наконечников: один quiver
+        span = end - start
+        ax.quiver(
+            start[:, 0], start[:, 1], span[:, 0], span[:, 1],
+            angles="xy", scale_units="xy", scale=1,
+            color="tab:gray", width=0.002, zorder=1,
         )
-        ax.add_patch(arrow)
-
-        # подпишем вес ребра чуть в стороне от середины вектора
-        mx = (sx + ex) / 2.0
-        my = (sy + ey) / 2.0
-        # небольшой сдвиг перпендикулярно ребру, чтобы подпись не ехала по самой линии
-        offset = node_radius * 1.2
-        nx = -dy / length
-        ny = dx / length
-        label_x = mx + nx * offset
-        label_y = my + ny * offset
-        ax.text(
-            label_x,
-            label_y,
-            f"{w:.2f}",
-            fontsize=8,
-            color="darkgreen",
-            ha="center",
-            va="center",
-            zorder=4,
+    elif m > HEAD_LIMIT:
+        # неориентированный плотный граф — просто отрезки
+        ax.add_collection(LineCollection(shafts, colors="tab:gray", linewidths=1.0, zorder=1))
+    elif directed:
+        # открытый наконечник "->" — два отрезка
+        shafts = np.concatenate(
+            [shafts, np.stack([left, end], axis=1), np.stack([right, end], axis=1)]
         )
+        ax.add_collection(LineCollection(shafts, colors="tab:gray", linewidths=1.5, zorder=1))
+    else:
+        # закрашенный наконечник "-|>"
+        heads = np.stack([left, end, right], axis=1)
+        ax.add_collection(
+            PolyCollection(heads, facecolors="tab:gray", edgecolors="tab:gray", zorder=1)
+        )
+        ax.add_collection(LineCollection(shafts, colors="tab:gray", linewidths=1.5, zorder=1))
+
+    if labels is None:
+        labels = m <= LABEL_LIMIT
+    if labels:
+        # подпишем вес ребра чуть в стороне от середины вектора, со сдвигом
+        # перпендикулярно ребру, чтобы подпись не ехала по самой линии
+        label_pos = (start + end) / 2.0 + normal * (node_radius * 1.2)
+        for (label_x, label_y), w in zip(label_pos, w_arr):
+            ax.text(
+                label_x,
+                label_y,
+                f"{w:.2f}",
+                fontsize=8,
+                color="darkgreen",
+                ha="center",
+                va="center",
+                zorder=4,
+            )
 
     ax.set_aspect("equal", adjustable="box")
     # фиксированные границы, чтобы граф не разъезжался из‑за подписей и стрелок
@@ -178,7 +233,7 @@ def draw_graph_vectors(
     ax.axis("off")
     ax.set_title(
         f"{'Ориентированный' if directed else 'Неориентированный'} граф, "
-        f"вершин: {n}, рёбер: {len(edges)}",
+        f"вершин: {n}, рёбер: {m}",
         fontsize=12,
     )
     plt.tight_layout()
@@ -186,8 +241,16 @@ def draw_graph_vectors(
 
 
 def main() -> None:
-    if len(sys.argv) >= 2:
-        filename = sys.argv[1]
+    args = sys.argv[1:]
+    labels: Optional[bool] = None
+    if "--labels" in args:
+        labels = True
+    if "--no-labels" in args:
+        labels = False
+    args = [a for a in args if a not in ("--labels", "--no-labels")]
+
+    if args:
+        filename = args[0]
     else:
         filename = input("Введите имя файла с графом (формат save_graph_to_file): ").strip()
 
@@ -205,10 +268,10 @@ def main() -> None:
         print("Граф пустой (n <= 0), нечего отображать.")
         return
 
-    if not edges:
+    if len(edges[0]) == 0:
         print("В файле нет рёбер, будут показаны только вершины.")
 
-    draw_graph_vectors(n, directed, edges)
+    draw_graph_vectors(n, directed, edges, labels=labels)
 
 
 if __name__ == "__main__":